@@ -36,6 +36,7 @@ setup(
     python_requires=">=3.6",
     test_suite="tests",
     install_requires=["katversion", "ska_logging >= 0.3.0", "ska-skuid >= 1.2.0"],
+    extras_require={"orjson": ["orjson"]},
     use_katversion=True,
     tests_require=["tox"],
 )
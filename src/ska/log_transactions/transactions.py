@@ -1,15 +1,32 @@
 # -*- coding: utf-8 -*-
 
 """This module provides the transaction logging mechanism."""
+import itertools
 import json
 import logging
 import os
+import threading
+import types
 
-from random import randint
-from typing import Mapping, Optional, Text
+from typing import Mapping, Optional
 
 from ska.skuid.client import SkuidClient
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+_DEFAULT_LOGGER = logging.getLogger("ska.transaction")  # pylint: disable=E1101
+
+# Shared, immutable default for transactions without parameters
+_EMPTY_PARAMS = types.MappingProxyType({})
+
+# Source of the markers that pair up the log messages of a transaction. The random start
+# keeps processes logging the same transaction ID from using the same markers.
+_marker_counter = itertools.count(int.from_bytes(os.urandom(3), "big"))
+
 
 class TransactionBase:
     """Transaction context handler.
@@ -56,20 +73,36 @@ class TransactionBase:
     |        Transaction[id]: Enter[name] with parameters [arguments] marker[marker]
     |    On Exit:
     |        Transaction[id]: Exit[name] marker[marker]
-    |    On exception:
-    |        Transaction[id]: Exception[name] marker[marker]
+    |    On exit with an exception:
+    |        Transaction[id]: Exception[name] Exit[name] marker[marker]
     |        Stacktrace
+    |
+    | The entry and exit log records also carry the `transaction_id`, `transaction_name`
+    | and `transaction_marker` attributes, for use by structured log formatters.
 
 
     """
 
+    __slots__ = (
+        "logger",
+        "_name",
+        "_params",
+        "_transaction_id",
+        "_random_marker",
+        "_prefix",
+        "_suffix",
+        "_extra",
+        "_max_log_params_bytes",
+    )
+
     def __init__(
         self,
         name: str,
-        params: dict = {},
+        params: Optional[Mapping] = None,
         transaction_id: str = "",
         transaction_id_key: str = "transaction_id",
         logger: Optional[logging.Logger] = None,  # pylint: disable=E1101
+        max_log_params_bytes: Optional[int] = 4096,
     ):
         """Create the transaction context handler.
 
@@ -90,111 +123,134 @@ class TransactionBase:
         :param name: A description for the context. This is usually the Tango device command.
         :type name: str
         :param params: The parameters will be logged and will be used to retrieve the transaction
-            ID if `transaction_id` is not passed in, defaults to {}
-        :type params: dict
+            ID if `transaction_id` is not passed in, defaults to None (no parameters)
+        :type params: Optional[Mapping], optional
         :param transaction_id: The transaction ID to be used for the context, defaults to ""
         :type transaction_id: str
         :param transaction_id_key: The key to use to get the transaction ID from params, defaults to "transaction_id"
         :type transaction_id_key: str
         :param logger: The logger to use for logging, by default None.
-            If no logger is specified a new one named `ska.transaction` will be used.
+            If no logger is specified the `ska.transaction` logger will be used.
         :type logger: Optional[logging.Logger], optional
+        :param max_log_params_bytes: The size above which the JSON encoded parameters are
+            truncated in the entry log message, defaults to 4096. None disables truncation.
+        :type max_log_params_bytes: Optional[int], optional
         :raises TransactionParamsError:  If the `params` passed is not valid.
+        :raises ValueError: If `max_log_params_bytes` is negative.
         """
 
-        if not isinstance(params, Mapping):
+        if params is None:
+            params = _EMPTY_PARAMS
+
+        # The identity check avoids the slower ABC instance check for the common dict case
+        if type(params) is not dict and not isinstance(params, Mapping):
             raise TransactionParamsError("params must be dict-like (Mapping)")
 
-        if logger:
-            self.logger = logger
-        else:
-            self.logger = logging.getLogger("ska.transaction")  # pylint: disable=E1101
+        if max_log_params_bytes is not None and max_log_params_bytes < 0:
+            raise ValueError("max_log_params_bytes must not be negative")
+
+        self.logger = logger or _DEFAULT_LOGGER
         self._name = name
         self._params = params
-        self._transaction_id_key = transaction_id_key
+        self._max_log_params_bytes = max_log_params_bytes
 
-        self._transaction_id = self._get_id_from_params_or_generate_new_id(transaction_id)
+        # Use the transaction_id passed in, or the one in params, or generate a new one
+        if transaction_id:
+            _transaction_id = transaction_id
+            # Only looked up to report that it is ignored
+            ignored_transaction_id = params.get(transaction_id_key)
+        else:
+            _transaction_id = params.get(transaction_id_key)
+            ignored_transaction_id = None
+        if not _is_valid_id(_transaction_id):
+            _transaction_id = _get_id_generator().next()  # pylint: disable=E1102
+            self.logger.info("Generated transaction ID %s", _transaction_id)
+        self._transaction_id = _transaction_id
 
-        # Used to match enter and exit when multiple devices calls the same command
-        # on a shared device simultaneously
-        self._random_marker = str(randint(0, 99999)).zfill(5)
+        # The marker and log message parts are only created once something is logged
+        self._random_marker = None
 
-        if transaction_id and params.get(self._transaction_id_key):
+        if ignored_transaction_id:
             self.logger.info(
-                f"Received 2 transaction IDs {transaction_id} and"
-                f" {params.get(transaction_id_key)}, using {self._transaction_id}"
+                "Received 2 transaction IDs %s and %s, using %s",
+                transaction_id,
+                ignored_transaction_id,
+                self._transaction_id,
             )
 
     def log_entry(self):
         """Log the entry message
         """
-        params_json = json.dumps(self._params)
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        self._init_log_parts()
+        params_json = _dumps(self._params, self._max_log_params_bytes)
         self.logger.info(
-            f"Transaction[{self._transaction_id}]: Enter[{self._name}] "
-            f"with parameters [{params_json}] "
-            f"marker[{self._random_marker}]"
+            "%sEnter[%s] with parameters [%s]%s",
+            self._prefix,
+            self._name,
+            params_json,
+            self._suffix,
+            extra=self._extra,
         )
 
-    def log_exit(self, exc_type):
-        """Log the exit message and exception if it occurs
+    def log_exit(self, exc_type, exc_val=None, exc_tb=None):
+        """Log the exit message, including the exception if one occurred
 
         :param exc_type: Exception type
         :type exc_type: exception_type
+        :param exc_val: The exception value, defaults to None
+        :type exc_val: exception_value, optional
+        :param exc_tb: The exception traceback, defaults to None
+        :type exc_tb: exception_traceback, optional
+
+        If an exception occurred but `exc_val` is not passed, it is re-raised here.
         """
         if exc_type:
-            self.logger.exception(
-                f"Transaction[{self._transaction_id}]: Exception[{self._name}] "
-                f"marker[{self._random_marker}]"
+            if self.logger.isEnabledFor(logging.ERROR):
+                self._init_log_parts()
+                self.logger.exception(
+                    "%sException[%s] Exit[%s]%s",
+                    self._prefix,
+                    self._name,
+                    self._name,
+                    self._suffix,
+                    exc_info=(exc_type, exc_val, exc_tb) if exc_val is not None else True,
+                    extra=self._extra,
+                )
+            if exc_val is None:
+                raise  # pylint: disable=E0704
+            # Otherwise __exit__/__aexit__ return None, so the exception propagates unchanged
+            return
+
+        if self.logger.isEnabledFor(logging.INFO):
+            self._init_log_parts()
+            self.logger.info(
+                "%sExit[%s]%s", self._prefix, self._name, self._suffix, extra=self._extra
             )
 
-        self.logger.info(
-            f"Transaction[{self._transaction_id}]: Exit[{self._name}] "
-            f"marker[{self._random_marker}]"
-        )
-
-        if exc_type:
-            raise  # pylint: disable=E0704
-
-    def _get_id_from_params_or_generate_new_id(self, transaction_id):
-        """At first use the transaction_id passed or use the transaction_id_key to get the
-        transaction ID from the parameters or generate a new one if it's not there.
-
-        :param transaction_id: The transaction ID
-        :type transaction_id: String
-        :return: A transaction ID
-        :rtype: String
+    def _init_log_parts(self):
+        """Create the marker and the parts shared by the entry and exit log messages,
+        if not done yet.
         """
-        _transaction_id = (
-            transaction_id if transaction_id else self._params.get(self._transaction_id_key)
-        )
-        if not self._is_valid_id(_transaction_id):
-            _transaction_id = self._generate_new_id()
-            self.logger.info(f"Generated transaction ID {_transaction_id}")
-        return _transaction_id
-
-    def _is_valid_id(self, transaction_id):
-        """Check if the ID is valid
-
-        :param transaction_id: The transaction ID
-        :type transaction_id: String
-        :return: Whether the ID is valid or not
-        :rtype: boolean
-        """
-        if isinstance(transaction_id, Text) and transaction_id.strip():
-            return True
-        return False
-
-    def _generate_new_id(self):
-        """Use TransactionIdGenerator to generate a new transaction ID
-
-        :return: The transaction ID
-        :rtype: String
-        """
-        id_generator = TransactionIdGenerator()
-        return id_generator.next()  # pylint: disable=E1102
+        if self._random_marker is not None:
+            return
+        # Used to match enter and exit when multiple devices calls the same command
+        # on a shared device simultaneously
+        self._random_marker = format(next(_marker_counter) & 0xFFFFF, "05x")
+        self._prefix = f"Transaction[{self._transaction_id}]: "
+        self._suffix = f" marker[{self._random_marker}]"
+        # Added to the entry and exit log records for structured log handlers
+        self._extra = {
+            "transaction_id": self._transaction_id,
+            "transaction_name": self._name,
+            "transaction_marker": self._random_marker,
+        }
 
 
 class Transaction(TransactionBase):
+    __slots__ = ()
+
     def __enter__(self):
         """Context handler entry
 
@@ -214,10 +270,12 @@ class Transaction(TransactionBase):
         :param exc_tb: The exception traceback
         :type exc_tb: exception_traceback
         """
-        self.log_exit(exc_type)
+        self.log_exit(exc_type, exc_val, exc_tb)
 
 
 class AsyncTransaction(TransactionBase):
+    __slots__ = ()
+
     async def __aenter__(self):
         """Asynchronous context handler entry
 
@@ -237,7 +295,7 @@ class AsyncTransaction(TransactionBase):
         :param exc_tb: The exception traceback
         :type exc_tb: exception_traceback
         """
-        self.log_exit(exc_type)
+        self.log_exit(exc_type, exc_val, exc_tb)
 
 
 class TransactionIdGenerator:
@@ -248,8 +306,9 @@ class TransactionIdGenerator:
     """
 
     def __init__(self):
-        if os.environ.get("SKUID_URL"):
-            client = SkuidClient(os.environ["SKUID_URL"])
+        url = os.environ.get("SKUID_URL")
+        if url:
+            client = SkuidClient(url)
             self._get_id = client.fetch_transaction_id
         else:
             self._get_id = SkuidClient.get_local_transaction_id
@@ -258,5 +317,92 @@ class TransactionIdGenerator:
         return self._get_id()
 
 
+_ID_GENERATOR: Optional[TransactionIdGenerator] = None
+_ID_GEN_LOCK = threading.Lock()
+
+
+def _get_id_generator():
+    """Get the process wide TransactionIdGenerator, creating it on first use.
+
+    :return: The transaction ID generator
+    :rtype: TransactionIdGenerator
+    """
+    global _ID_GENERATOR  # pylint: disable=W0603
+    if _ID_GENERATOR is None:
+        with _ID_GEN_LOCK:
+            if _ID_GENERATOR is None:
+                _ID_GENERATOR = TransactionIdGenerator()
+    return _ID_GENERATOR
+
+
+def _is_valid_id(transaction_id):
+    """Check if the ID is valid
+
+    :param transaction_id: The transaction ID
+    :type transaction_id: String
+    :return: Whether the ID is valid or not
+    :rtype: boolean
+    """
+    return (
+        isinstance(transaction_id, str)
+        and len(transaction_id) > 0
+        and not transaction_id.isspace()
+    )
+
+
+def _dumps(obj, max_bytes=None):
+    """Serialise `obj` to a JSON string, using orjson if it is installed.
+
+    Falls back to the standard library, with the same compact output, for anything orjson
+    cannot encode (e.g. non-str keys).
+
+    :param obj: The object to serialise
+    :type obj: object
+    :param max_bytes: The size above which the output is truncated, defaults to None (no limit)
+    :type max_bytes: Optional[int], optional
+    :return: The JSON encoded object
+    :rtype: String
+    """
+    if orjson is not None:
+        try:
+            data = orjson.dumps(obj, default=_json_default)  # pylint: disable=E1101
+        except TypeError:
+            pass
+        else:
+            if max_bytes is not None and len(data) > max_bytes:
+                # Ignore a multi-byte character split by the cut
+                return (
+                    data[:max_bytes].decode(errors="ignore")
+                    + f"...<truncated {len(data) - max_bytes} bytes>"
+                )
+            return data.decode()
+
+    # Same output as orjson: compact and not escaping non-ASCII characters
+    text = json.dumps(obj, default=_json_default, separators=(",", ":"), ensure_ascii=False)
+    # A character is at most 4 bytes in UTF-8, so only encode when the limit may be exceeded
+    if max_bytes is not None and len(text) * 4 > max_bytes:
+        data = text.encode()
+        if len(data) > max_bytes:
+            return (
+                data[:max_bytes].decode(errors="ignore")
+                + f"...<truncated {len(data) - max_bytes} bytes>"
+            )
+    return text
+
+
+def _json_default(obj):
+    """Convert objects that the JSON encoders do not support natively.
+
+    :param obj: The object to convert
+    :type obj: object
+    :return: A dict copy of `obj` if it is a Mapping
+    :rtype: dict
+    :raises TypeError: If `obj` cannot be converted
+    """
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
 class TransactionParamsError(TypeError):
     """Invalid data type for transaction parameters."""
@@ -2,12 +2,24 @@
 A module defining pytest fixtures for testing ska.logging.
 """
 import logging
+import queue
+import sys
+import threading
+
+from logging.handlers import QueueHandler, QueueListener
 
 import pytest
 
 from ska.logging import configure_logging
 
 
+def pytest_report_header(config):
+    """Report whether the GIL is enabled, to confirm free-threaded runs really are."""
+    if hasattr(sys, "_is_gil_enabled"):
+        return f"GIL enabled: {sys._is_gil_enabled()}"
+    return None
+
+
 @pytest.fixture
 def reset_logging():
     """Cleanup logging module's state after each test (at least try to)."""
@@ -46,6 +58,35 @@ class AppendHandler(logging.Handler):
         self.records.append(record)
         self.logs.append(self.format(record))
 
+    def drain(self):
+        """Return the formatted log messages so far, and start new, empty, histories."""
+        with self.lock:
+            logs, self.logs, self.records = self.logs, [], []
+        return logs
+
+
+class FlushableQueueListener(QueueListener):
+    """Queue listener that can wait for the records queued so far to be handled."""
+
+    def handle(self, record):
+        if isinstance(record, threading.Event):
+            record.set()
+            return
+        super().handle(record)
+
+    def flush(self, timeout=10):
+        """Block until every record queued before this call has been handled.
+
+        Fails the test if the listener thread has died (e.g. a handler raised), or does
+        not catch up within `timeout` seconds.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            pytest.fail("Recorder queue listener is not running")
+        handled = threading.Event()
+        self.queue.put_nowait(handled)
+        if not handled.wait(timeout=timeout):
+            pytest.fail(f"Recorder queue not flushed within {timeout}s")
+
 
 """Override configuration for recording loggers"""
 RECORDER_OVERRIDES = {
@@ -78,7 +119,13 @@ def recording_logger():
 
 @pytest.fixture
 def recording_tags_logger():
-    """Return user logger like :func:`recording_logger`, but including tags filter."""
+    """Return user logger like :func:`recording_logger`, but including tags filter.
+
+    Records reach the recording handler through a `QueueHandler` and a single listener
+    thread, so the recording handler only ever runs on that thread. Logging threads still
+    take the `QueueHandler`'s lock and format the record there (in `prepare`), and the
+    recording handler formats it again.
+    """
 
     class MyFilter(logging.Filter):
         def filter(self, record):
@@ -86,31 +133,41 @@ def recording_tags_logger():
             return True
 
     configure_logging(tags_filter=MyFilter, overrides=RECORDER_OVERRIDES)
+    root_logger = logging.getLogger()
+    recorder = get_named_handler(root_logger, "recorder")
+    queue_handler = QueueHandler(queue.SimpleQueue())
+    queue_handler.name = "recorder_queue"
+    queue_handler.listener = FlushableQueueListener(queue_handler.queue, recorder)
+    root_logger.removeHandler(recorder)
+    root_logger.addHandler(queue_handler)
+    queue_handler.listener.start()
     yield logging.getLogger("ska.logger")
+    queue_handler.listener.stop()
+    root_logger.removeHandler(queue_handler)
 
 
 def get_first_record_and_log_message(logger):
-    recorder = get_named_handler(logger, "recorder")
+    recorder = get_recorder(logger)
     record = recorder.records[0]
     log_message = recorder.logs[0]
     return record, log_message
 
 
 def get_second_record_and_log_message(logger):
-    recorder = get_named_handler(logger, "recorder")
+    recorder = get_recorder(logger)
     record = recorder.records[1]
     log_message = recorder.logs[1]
     return record, log_message
 
 def get_last_record_and_log_message(logger):
-    recorder = get_named_handler(logger, "recorder")
+    recorder = get_recorder(logger)
     record = recorder.records[-1]
     log_message = recorder.logs[-1]
     return record, log_message
 
 def get_all_record_logs(logger):
-    recorder = get_named_handler(logger, "recorder")
-    return recorder.logs
+    """Return all the log messages recorded so far, and clear the recorder."""
+    return get_recorder(logger).drain()
 
 def get_named_handler(logger, name):
     """Search up through logger hierarchy to find a handler with the specified name."""
@@ -120,10 +177,13 @@ def get_named_handler(logger, name):
                 return handler
         logger = logger.parent
 
-def clear_logger_logs(logger):
-    recorder = get_named_handler(logger, "recorder")
-    recorder.logs = []
-    recorder.records = []
+def get_recorder(logger):
+    """Return the recording handler, once any records queued for it have been handled."""
+    queue_handler = get_named_handler(logger, "recorder_queue")
+    if queue_handler:
+        queue_handler.listener.flush()
+        return queue_handler.listener.handlers[0]
+    return get_named_handler(logger, "recorder")
 
 @pytest.fixture
 def id_generator_stub(mocker):
@@ -132,11 +192,17 @@ def id_generator_stub(mocker):
     class TransactionIdGeneratorStub:
         last_id = "NOT SET"
         call_count = 0
+        instance_count = 0
+
+        def __init__(self):
+            TransactionIdGeneratorStub.instance_count += 1
 
         def next(self):
             TransactionIdGeneratorStub.last_id = "XYZ-789"
             TransactionIdGeneratorStub.call_count += 1
             return TransactionIdGeneratorStub.last_id
 
+    # Drop the cached generator so that the stub is picked up, the original is restored afterwards
+    mocker.patch('ska.log_transactions.transactions._ID_GENERATOR', None)
     mocker.patch('ska.log_transactions.transactions.TransactionIdGenerator', TransactionIdGeneratorStub)
     yield TransactionIdGeneratorStub
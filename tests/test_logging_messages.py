@@ -1,20 +1,34 @@
-import pytest
+import re
 
-from collections import Counter
+import pytest
 
 from .transactions_threaded import ThreadingLogsGenerator
-from .transactions_async import AsyncLogsGenerator
+from .transactions_async import AsyncLogsGenerator, new_event_loop
+
+_TRANSACTION_RE = re.compile(r"Transaction\[(?P<tid>[^\]]+)\].*?marker\[(?P<mk>[^\]]+)\]")
+
+
+@pytest.fixture(scope="session")
+def session_event_loop():
+    """Event loop shared by the async log generators for the whole test session."""
+    loop = new_event_loop()
+    yield loop
+    loop.close()
 
 
 @pytest.fixture
-def async_logs_local_logger(request, recording_tags_logger):
-    tlg = AsyncLogsGenerator(logger=recording_tags_logger, pass_logger=True)
+def async_logs_local_logger(request, recording_tags_logger, session_event_loop):
+    tlg = AsyncLogsGenerator(
+        logger=recording_tags_logger, pass_logger=True, loop=session_event_loop
+    )
     return tlg.get_logs()
 
 
 @pytest.fixture
-def async_logs_global_logger(request, recording_tags_logger):
-    tlg = AsyncLogsGenerator(logger=recording_tags_logger, pass_logger=False)
+def async_logs_global_logger(request, recording_tags_logger, session_event_loop):
+    tlg = AsyncLogsGenerator(
+        logger=recording_tags_logger, pass_logger=False, loop=session_event_loop
+    )
     return tlg.get_logs()
 
 
@@ -33,65 +47,59 @@ def threaded_logs_global_logger(request, recording_tags_logger):
 class TestTransactionScenarios:
     def test_async_transaction_logs(self, async_logs_global_logger, async_logs_local_logger):
         all_logs = async_logs_global_logger + async_logs_local_logger
-        self.check_logs_outside_transaction_has_no_transaction_ids(all_logs)
-        self.check_internal_log_has_no_transaction_id(all_logs)
-        self.check_enter_exit_exception_matches(all_logs)
+        self.check_logs(all_logs)
 
+    @pytest.mark.freethreaded
     def test_transaction_logs(self, threaded_logs_global_logger, threaded_logs_local_logger):
         all_logs = threaded_logs_global_logger + threaded_logs_local_logger
-        self.check_logs_outside_transaction_has_no_transaction_ids(all_logs)
-        self.check_internal_log_has_no_transaction_id(all_logs)
-        self.check_enter_exit_exception_matches(all_logs)
-
-    def check_logs_outside_transaction_has_no_transaction_ids(self, all_logs):
-        outside_transaction_logs = [log for log in all_logs if "no transaction" in log]
-        assert outside_transaction_logs
-        for log in outside_transaction_logs:
-            assert "Transaction[" not in log, f"transaction_id should not be in log {log}"
-
-    def check_internal_log_has_no_transaction_id(self, all_logs):
-        internal_logs = [log for log in all_logs if "in transaction" in log]
-        assert internal_logs
-        for log in internal_logs:
-            assert "Transaction[" not in log
-
-    def check_enter_exit_exception_matches(self, all_logs):
-        enter_exit_logs = []
-        enter_exit_logs += [log for log in all_logs if "Enter[" in log]
-        enter_exit_logs += [log for log in all_logs if "Exit[" in log]
+        self.check_logs(all_logs)
+
+    def check_logs(self, all_logs):
+        # Classify all the logs in a single pass, checking the ones outside of, or internal
+        # to, a transaction on the way
+        outside_transaction_count = internal_count = 0
+        enter_logs, exit_logs, exception_logs = [], [], []
+        for log in all_logs:
+            if "no transaction" in log:
+                outside_transaction_count += 1
+                assert "Transaction[" not in log, f"transaction_id should not be in log {log}"
+            elif "in transaction" in log:
+                internal_count += 1
+                assert "Transaction[" not in log
+            elif "Enter[" in log:
+                enter_logs.append(log)
+            elif "Exit[" in log:
+                exit_logs.append(log)
+            if "RuntimeError" in log:
+                exception_logs.append(log)
+        assert outside_transaction_count
+        assert internal_count
+        self.check_enter_exit_exception_matches(enter_logs + exit_logs, exception_logs)
+
+    def check_enter_exit_exception_matches(self, enter_exit_logs, exception_logs):
         assert enter_exit_logs
         assert len(enter_exit_logs) % 2 == 0
 
         transaction_id_marker = []
         for log in enter_exit_logs:
-            transaction_id_marker.append(
-                (get_marker_in_message(log), get_transaction_id_in_message(log))
-            )
+            transaction_id_marker.append(parse_marker_and_transaction_id(log))
         # Group enter exit by (transaction_id, marker)
         # Make sure there is only 2 of each
-        counter = dict(Counter(transaction_id_marker))
+        counter = {}
+        for key in transaction_id_marker:
+            counter[key] = counter.get(key, 0) + 1
         for items, count in counter.items():
             assert count == 2, f"Found {count} of {items} instead of 2"
 
         # Make sure there's a enter/exit for every exception
-        exception_logs = [log for log in all_logs if "RuntimeError" in log]
         assert exception_logs
+        transaction_id_marker_set = set(transaction_id_marker)
         for log in exception_logs:
-            assert (
-                get_marker_in_message(log),
-                get_transaction_id_in_message(log),
-            ) in transaction_id_marker
-
-
-def get_transaction_id_in_message(log_message):
-    if "Transaction[" in log_message:
-        transaction_index = log_message.index("Transaction[")
-        return log_message[transaction_index + 12:transaction_index + 40]
-    return None
+            assert parse_marker_and_transaction_id(log) in transaction_id_marker_set
 
 
-def get_marker_in_message(log_message):
-    if "marker[" in log_message:
-        marker_index = log_message.index("marker[")
-        return log_message[marker_index + 7:marker_index + 12]
-    return None
+def parse_marker_and_transaction_id(log_message):
+    match = _TRANSACTION_RE.search(log_message)
+    if match:
+        return match["mk"], match["tid"]
+    return None, None
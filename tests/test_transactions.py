@@ -4,6 +4,8 @@
 import json
 import os
 
+from types import MappingProxyType
+
 import pytest
 import concurrent.futures
 
@@ -104,6 +106,13 @@ class TestTransactionIdGeneration:
         with transaction("name", parameters):
             assert id_generator_stub.call_count == 1
 
+    def test_id_provider_created_once_for_many_new_ids(self, id_generator_stub):
+        for _ in range(3):
+            with transaction("name", {}):
+                pass
+        assert id_generator_stub.call_count == 3
+        assert id_generator_stub.instance_count == 1
+
     def test_id_provider_not_used_for_existing_valid_id(self, id_generator_stub):
         parameters = {"transaction_id": "abc1234"}
         with transaction("name", parameters):
@@ -127,13 +136,93 @@ class TestTransactionLogging:
         assert "name" in second_log_message
         assert "other" in second_log_message
         assert transaction_id in second_log_message
-        assert json.dumps(parameters) in second_log_message
+        params_json = second_log_message.split("with parameters [", 1)[1].rsplit("] marker[", 1)[0]
+        assert json.loads(params_json) == parameters
 
         # __exit__ log message
         assert "Exit" in last_log_message
         assert "name" in last_log_message
         assert transaction_id in last_log_message
 
+    def test_both_ids_reported(self, recording_logger):
+        parameters = {"transaction_id": "xyz123"}
+        with transaction("name", parameters, transaction_id="abc1234"):
+            pass
+        record_logs = get_all_record_logs(recording_logger)
+        assert "Received 2 transaction IDs abc1234 and xyz123, using abc1234" in record_logs[0]
+
+    def test_generated_id_message_is_formatted_lazily(self, recording_logger):
+        with transaction("name", {}) as transaction_id:
+            pass
+        first_record, first_log_message = get_first_record_and_log_message(recording_logger)
+        assert first_record.msg == "Generated transaction ID %s"
+        assert first_record.args == (transaction_id,)
+        assert f"Generated transaction ID {transaction_id}" in first_log_message
+
+    @pytest.mark.parametrize("parameters", [None, MappingProxyType({})])
+    def test_params_default_and_non_dict_mapping_are_logged(self, recording_logger, parameters):
+        with transaction("name", parameters, transaction_id="abc1234"):
+            pass
+        _, first_log_message = get_first_record_and_log_message(recording_logger)
+        assert "with parameters [{}]" in first_log_message
+
+    def test_params_with_non_string_keys_are_logged(self, recording_logger):
+        parameters = {1: "config"}
+        with transaction("name", parameters, transaction_id="abc1234"):
+            pass
+        _, first_log_message = get_first_record_and_log_message(recording_logger)
+        assert '{"1":"config"}' in first_log_message
+
+    def test_transaction_details_in_record_attributes(self, recording_logger):
+        with transaction("name", {}) as transaction_id:
+            pass
+        entry_record, entry_log_message = get_second_record_and_log_message(recording_logger)
+        exit_record, exit_log_message = get_last_record_and_log_message(recording_logger)
+        for record, log_message in [
+            (entry_record, entry_log_message),
+            (exit_record, exit_log_message),
+        ]:
+            assert record.transaction_id == transaction_id
+            assert record.transaction_name == "name"
+            assert f"marker[{record.transaction_marker}]" in log_message
+        assert entry_record.transaction_marker == exit_record.transaction_marker
+
+    def test_large_params_truncated(self, recording_logger):
+        parameters = {"other": "x" * 100}
+        with transaction("name", parameters, transaction_id="abc1234", max_log_params_bytes=20):
+            pass
+        _, first_log_message = get_first_record_and_log_message(recording_logger)
+        assert 'with parameters [{"other":' in first_log_message
+        assert "...<truncated " in first_log_message
+        assert "x" * 100 not in first_log_message
+
+    def test_error_if_max_log_params_bytes_is_negative(self):
+        with pytest.raises(ValueError):
+            with transaction("name", {}, transaction_id="abc1234", max_log_params_bytes=-3):
+                pass
+
+    def test_large_params_not_truncated_if_disabled(self, recording_logger):
+        parameters = {"other": "x" * 10000}
+        with transaction("name", parameters, transaction_id="abc1234", max_log_params_bytes=None):
+            pass
+        _, first_log_message = get_first_record_and_log_message(recording_logger)
+        assert "x" * 10000 in first_log_message
+        assert "...<truncated " not in first_log_message
+
+    def test_params_logged_the_same_without_orjson(self, recording_logger, monkeypatch):
+        parameters = {"other": ["config", 1, 2, 3.0], "name": "é"}
+        with transaction("name", parameters, transaction_id="abc1234"):
+            pass
+        monkeypatch.setattr("ska.log_transactions.transactions.orjson", None)
+        with transaction("name", parameters, transaction_id="abc1234"):
+            pass
+        logs = [log for log in get_all_record_logs(recording_logger) if "Enter[" in log]
+        assert len(logs) == 2
+        params_text = [
+            log.split("with parameters [", 1)[1].rsplit("] marker[", 1)[0] for log in logs
+        ]
+        assert params_text[0] == params_text[1]
+
     def test_exception_logs_transaction_id_and_command(self, recording_logger):
         parameters = {"other": ["config", 1, 2, 3.0]}
         with pytest.raises(RuntimeError):
@@ -147,6 +236,26 @@ class TestTransactionLogging:
 
         assert 0, f"RuntimeError and transaction tag not found in exception logs: {record_logs}"
 
+    def test_exception_and_exit_logged_once(self, recording_logger):
+        with pytest.raises(RuntimeError):
+            with transaction("name", {}, transaction_id="abc1234"):
+                raise RuntimeError("Something went wrong")
+
+        last_record, last_log_message = get_last_record_and_log_message(recording_logger)
+        record_logs = get_all_record_logs(recording_logger)
+        assert len(record_logs) == 2, f"Log messages incorrect {record_logs}"
+        assert last_record.levelname == "ERROR"
+        assert "Exception[name] Exit[name]" in last_log_message
+        assert "RuntimeError: Something went wrong" in last_log_message
+
+    def test_exception_reraised_unchanged(self):
+        error = RuntimeError("Something went wrong")
+        with pytest.raises(RuntimeError) as exc_info:
+            with transaction("name", {}, transaction_id="abc1234"):
+                raise error
+        assert exc_info.value is error
+        assert all(entry.name != "log_exit" for entry in exc_info.traceback)
+
     def test_specified_logger(self):
         logger = MagicMock()
         parameters = {}
@@ -156,6 +265,16 @@ class TestTransactionLogging:
             assert logger.info.call_args_list[i].starts_with(message)
         assert logger.info.call_count == 4, f"Log calls incorrect {logger.info.call_args_list}"
 
+    def test_nothing_prepared_if_info_disabled(self):
+        logger = MagicMock()
+        logger.isEnabledFor.return_value = False
+        parameters = {"other": object()}
+        context = transaction("name", parameters, transaction_id="abc1234", logger=logger)
+        with context:
+            pass
+        assert context._random_marker is None
+        logger.info.assert_not_called()
+
 
 class TestTransactionIdGenerator:
     """Tests for :class:`~ska.log_transactions.transactions.TransactionIdGenerator`."""
@@ -2,7 +2,27 @@
 import asyncio
 
 from ska.log_transactions import async_transaction
-from tests.conftest import get_all_record_logs, clear_logger_logs
+from tests.conftest import get_all_record_logs
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover
+    uvloop = None
+
+# Number of coroutines of each kind run by get_logs
+JOB_COUNT = 10
+
+
+def new_event_loop():
+    """Create a uvloop event loop if uvloop is installed, else a default asyncio one."""
+    if uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+# Reused errors, one per job index so that concurrent jobs never raise (and so set the
+# traceback of) the same instance
+_ERRORS = [RuntimeError("An exception has occurred") for _ in range(JOB_COUNT)]
 
 
 class AsyncLogsGenerator:
@@ -10,39 +30,59 @@ class AsyncLogsGenerator:
     Some uses the transaction context and some not.
     """
 
-    def __init__(self, logger=None, pass_logger=False):
+    # Transaction name for each index
+    _NAMES = [f"Transaction thread [{i}]" for i in range(JOB_COUNT)]
+
+    def __init__(self, logger=None, pass_logger=False, loop=None):
         self.logger = logger
         self.pass_logger = pass_logger
+        self.loop = loop
 
     async def async_with_transaction_exception(self, thread_index):
+        name = self._NAMES[thread_index]
         logger = self.logger if self.pass_logger else None
+        info = self.logger.info
         try:
-            async with async_transaction(f"Transaction thread [{thread_index}]", logger=logger):
-                self.logger.info(
-                    f"Transaction thread in transaction [{thread_index}], in transaction"
-                )
-                raise RuntimeError("An exception has occurred")
+            async with async_transaction(name, logger=logger):
+                info("Transaction thread in transaction [%s], in transaction", thread_index)
+                raise _ERRORS[thread_index].with_traceback(None) from None
         except RuntimeError:
             pass
 
     async def async_with_transaction(self, thread_index):
+        name = self._NAMES[thread_index]
         logger = self.logger if self.pass_logger else None
-        async with async_transaction(f"Transaction thread [{thread_index}]", logger=logger):
-            self.logger.info(f"Transaction thread [{thread_index}], in transaction")
-        self.logger.info(f"Thread log [{thread_index}], no transaction")
+        info = self.logger.info
+        async with async_transaction(name, logger=logger):
+            info("Transaction thread [%s], in transaction", thread_index)
+        info("Thread log [%s], no transaction", thread_index)
 
     async def async_without_transaction(self, thread_index):
-        self.logger.info(f"Thread log [{thread_index}], no transaction")
+        self.logger.info("Thread log [%s], no transaction", thread_index)
 
     async def run_all_transactions(self):
-        coros = []
-        for coro_index in range(10):
-            coros.append(self.async_with_transaction_exception(coro_index))
-            coros.append(self.async_with_transaction(coro_index))
-            coros.append(self.async_without_transaction(coro_index))
-        await asyncio.gather(*coros)
+        if not hasattr(asyncio, "TaskGroup"):  # Python < 3.11
+            coros = []
+            for coro_index in range(JOB_COUNT):
+                coros.append(self.async_with_transaction_exception(coro_index))
+                coros.append(self.async_with_transaction(coro_index))
+                coros.append(self.async_without_transaction(coro_index))
+            await asyncio.gather(*coros)
+            return
+
+        async with asyncio.TaskGroup() as task_group:  # pylint: disable=E1101
+            for coro_index in range(JOB_COUNT):
+                task_group.create_task(self.async_with_transaction_exception(coro_index))
+                task_group.create_task(self.async_with_transaction(coro_index))
+                task_group.create_task(self.async_without_transaction(coro_index))
 
     def get_logs(self):
-        clear_logger_logs(self.logger)
-        asyncio.run(self.run_all_transactions())
+        if self.loop is not None:
+            self.loop.run_until_complete(self.run_all_transactions())
+        else:
+            loop = new_event_loop()
+            try:
+                loop.run_until_complete(self.run_all_transactions())
+            finally:
+                loop.close()
         return get_all_record_logs(self.logger)
@@ -1,59 +1,74 @@
 """Tests for the logging transactions module focusing on threads"""
-from threading import Thread
+import atexit
+import contextvars
+import itertools
+import os
+
+from concurrent.futures import ThreadPoolExecutor
 
 from ska.log_transactions import transaction
-from tests.conftest import get_all_record_logs, clear_logger_logs
+from tests.conftest import get_all_record_logs
+
+# Number of jobs of each kind run by get_logs
+JOB_COUNT = 10
+
+# Reused by every ThreadingLogsGenerator, so threads are not created per test
+_POOL = ThreadPoolExecutor(max_workers=min(30, (os.cpu_count() or 1) * 4))
+atexit.register(_POOL.shutdown)
+
+# Reused errors, one per job index so that concurrent jobs never raise (and so set the
+# traceback of) the same instance
+_ERRORS = [RuntimeError("An exception has occurred") for _ in range(JOB_COUNT)]
 
 
 class ThreadingLogsGenerator:
-    """Generate logs by spawning a number of threads and logging in them
+    """Generate logs by running a number of jobs on a thread pool and logging in them
     Some uses the transaction context and some not.
     """
 
+    # Transaction name for each index
+    _NAMES = [f"Transaction thread [{i}]" for i in range(JOB_COUNT)]
+
     def __init__(self, logger=None, pass_logger=False):
         self.logger = logger
         self.pass_logger = pass_logger
 
     def thread_with_transaction_exception(self, thread_index):
+        name = self._NAMES[thread_index]
         logger = self.logger if self.pass_logger else None
+        info = self.logger.info
         try:
-            with transaction(f"Transaction thread [{thread_index}]", logger=logger):
-                self.logger.info(
-                    f"Transaction thread in transaction [{thread_index}], in transaction"
-                )
-                raise RuntimeError("An exception has occurred")
+            with transaction(name, logger=logger):
+                info("Transaction thread in transaction [%s], in transaction", thread_index)
+                raise _ERRORS[thread_index].with_traceback(None) from None
         except RuntimeError:
             pass
 
     def thread_with_transaction(self, thread_index):
+        name = self._NAMES[thread_index]
         logger = self.logger if self.pass_logger else None
-        with transaction(f"Transaction thread [{thread_index}]", logger=logger):
-            self.logger.info(f"Transaction thread [{thread_index}], in transaction")
-        self.logger.info(f"Thread log [{thread_index}], no transaction")
+        info = self.logger.info
+        with transaction(name, logger=logger):
+            info("Transaction thread [%s], in transaction", thread_index)
+        info("Thread log [%s], no transaction", thread_index)
 
     def thread_without_transaction(self, thread_index):
-        self.logger.info(f"Thread log [{thread_index}], no transaction")
+        self.logger.info("Thread log [%s], no transaction", thread_index)
 
     def get_logs(self):
-        clear_logger_logs(self.logger)
-        test_threads = []
-        for thread_index in range(10):
-            thread_in_transaction = Thread(
-                target=self.thread_with_transaction, args=(thread_index,)
-            )
-            thread_no_transaction = Thread(
-                target=self.thread_without_transaction, args=(thread_index,)
-            )
-            thread_exception = Thread(
-                target=self.thread_with_transaction_exception, args=(thread_index,)
-            )
-            test_threads.append(thread_in_transaction)
-            test_threads.append(thread_no_transaction)
-            test_threads.append(thread_exception)
-
-        for t in test_threads:
-            t.start()
-        for t in test_threads:
-            t.join()
+        targets = (
+            self.thread_with_transaction,
+            self.thread_without_transaction,
+            self.thread_with_transaction_exception,
+        )
+        jobs = [
+            (target, thread_index)
+            for thread_index, target in itertools.product(range(JOB_COUNT), targets)
+        ]
+
+        # Run every job in a copy of the caller's context, as pool threads do not inherit it.
+        # A context can only be entered by one thread at a time, hence a copy per job.
+        context = contextvars.copy_context()
+        list(_POOL.map(lambda job: context.copy().run(*job), jobs))
 
         return get_all_record_logs(self.logger)